@@ -10,6 +10,7 @@ import subprocess
 import platform
 import shutil
 import argparse
+import functools
 from pathlib import Path
 
 # Configuración del proyecto
@@ -17,6 +18,9 @@ PROJECT_NAME = "nopal-detector"
 VENV_DIR = Path(".venv")
 REQUIREMENTS = ["opencv-python>=4.9.0", "numpy>=1.26"]
 
+# Carpetas en las que la limpieza no desciende (además de las ocultas)
+CLEAN_SKIP_DIRS = frozenset({"node_modules", "venv"})
+
 # Detección del sistema operativo
 IS_WIN = platform.system().lower().startswith("win")
 IS_MAC = platform.system().lower().startswith("darwin")
@@ -63,11 +67,15 @@ def run_command(cmd, shell=False, check=True, capture_output=False):
         print_colored(f"❌ Comando no encontrado: {cmd}", Colors.RED)
         return None
 
+@functools.lru_cache(maxsize=1)
 def get_python_executable():
-    """Obtiene el ejecutable de Python correcto"""
+    """Obtiene el ejecutable de Python correcto (cacheado tras la primera búsqueda)"""
     candidates = ["python3", "python", "py"]
     
     for cmd in candidates:
+        # Evita lanzar subprocesos para comandos que no están en PATH
+        if shutil.which(cmd) is None:
+            continue
         result = run_command([cmd, "--version"], capture_output=True, check=False)
         if result and result.returncode == 0:
             # Verificar que es Python 3
@@ -131,11 +139,13 @@ def setup_venv():
         return False
     
     # Crear venv si no existe
+    venv_created = False
     if not venv_exists():
         print_colored("📦 Creando entorno virtual...", Colors.YELLOW)
         result = run_command([python_cmd, "-m", "venv", str(VENV_DIR)])
         if not result:
             return False
+        venv_created = True
     else:
         print_colored("✅ Entorno virtual ya existe", Colors.GREEN)
     
@@ -149,21 +159,25 @@ def setup_venv():
     version = result.stdout.strip()
     print_colored(f"✅ Entorno virtual funcionando: {version}", Colors.GREEN)
     
-    # Actualizar pip
-    print_colored("📦 Actualizando pip y wheel...", Colors.YELLOW)
     pip_cmd = get_venv_pip()
-    result = run_command(pip_cmd + ["install", "--upgrade", "pip", "wheel"])
-    if not result:
-        return False
+    install_cmd = pip_cmd + ["install", "--disable-pip-version-check", "--no-input"]
     
-    # Instalar dependencias
+    # Actualizar pip/wheel solo en un venv recién creado, en su propia llamada
+    # para que los requisitos los resuelva ya el pip nuevo
+    if venv_created:
+        print_colored("📦 Actualizando pip y wheel...", Colors.YELLOW)
+        result = run_command(install_cmd + ["--upgrade", "pip", "wheel"])
+        if not result:
+            return False
+    
+    # Instalar dependencias (sin --upgrade: si ya se cumplen no se toca el índice)
     print_colored("📦 Instalando dependencias...", Colors.YELLOW)
     
     # Verificar si existe requirements.txt
     if Path("requirements.txt").exists():
-        result = run_command(pip_cmd + ["install", "-r", "requirements.txt"])
+        result = run_command(install_cmd + ["-r", "requirements.txt"])
     else:
-        result = run_command(pip_cmd + ["install"] + REQUIREMENTS)
+        result = run_command(install_cmd + REQUIREMENTS)
     
     if not result:
         return False
@@ -272,8 +286,10 @@ def run_detector(source="0", save=None, **kwargs):
     
     # Agregar parámetros adicionales
     for key, value in kwargs.items():
-        if key in ["min_matches", "ratio"] and value is not None:
+        if key in ["min_matches", "ratio", "max_side", "nfeatures", "fast_threshold"] and value is not None:
             cmd.extend([f"--{key}", str(value)])
+    if kwargs.get("hw_encode"):
+        cmd.append("--hw_encode")
     
     print_colored("🚀 Iniciando detección...", Colors.GREEN)
     print_colored("💡 Presiona 'q' para salir (si es cámara/video)", Colors.YELLOW)
@@ -282,7 +298,7 @@ def run_detector(source="0", save=None, **kwargs):
     result = run_command(cmd, check=False)
     return result is not None and result.returncode == 0
 
-def clean_project(deep=False, preserve_outputs=False):
+def clean_project(deep=False, preserve_outputs=False, jobs=None):
     """Limpia archivos temporales del proyecto con opciones avanzadas"""
     if deep:
         print_header("Limpieza PROFUNDA del proyecto")
@@ -318,7 +334,7 @@ def clean_project(deep=False, preserve_outputs=False):
         "*.temp",
         "*.bak",
         "*.orig",
-        "*.DS_Store",
+        ".DS_Store",
         "Thumbs.db",
         "*.swp",
         "*.swo"
@@ -345,49 +361,27 @@ def clean_project(deep=False, preserve_outputs=False):
     cleaned_count = 0
     cleaned_size = 0
     
-    for item in items_to_clean:
-        if "*" in item:
-            # Usar glob para patrones
-            from glob import glob
-            import os
-            
-            # Buscar en directorio actual y subdirectorios
-            pattern_files = glob(item, recursive=True)
-            # También buscar en subdirectorios específicos
-            for subdir in ["", "**"]:
-                pattern_files.extend(glob(f"{subdir}/{item}", recursive=True))
-            
-            # Eliminar duplicados
-            pattern_files = list(set(pattern_files))
-            
-            for file in pattern_files:
-                try:
-                    if os.path.isfile(file):
-                        size = os.path.getsize(file)
-                        os.remove(file)
-                        print_colored(f"🗑️ Archivo: {file} ({_format_size(size)})", Colors.YELLOW)
-                        cleaned_count += 1
-                        cleaned_size += size
-                except Exception as e:
-                    print_colored(f"⚠️ No se pudo eliminar {file}: {e}", Colors.YELLOW)
-        else:
-            path = Path(item)
-            if path.exists():
-                try:
-                    if path.is_dir():
-                        size = _get_dir_size(path)
-                        shutil.rmtree(path)
-                        print_colored(f"🗑️ Directorio: {item}/ ({_format_size(size)})", Colors.YELLOW)
-                        cleaned_count += 1
-                        cleaned_size += size
-                    else:
-                        size = path.stat().st_size
-                        path.unlink()
-                        print_colored(f"🗑️ Archivo: {item} ({_format_size(size)})", Colors.YELLOW)
-                        cleaned_count += 1
-                        cleaned_size += size
-                except Exception as e:
-                    print_colored(f"⚠️ No se pudo eliminar {item}: {e}", Colors.YELLOW)
+    # Un solo recorrido del árbol para todos los patrones
+    dirs_to_delete, files_to_delete = _scan_clean_targets(items_to_clean)
+    
+    dir_sizes = {item: _get_dir_size(item) for item in dirs_to_delete}
+    dir_errors = _remove_dirs(dirs_to_delete)
+    for item in dirs_to_delete:
+        if item in dir_errors:
+            print_colored(f"⚠️ No se pudo eliminar {item}: {dir_errors[item]}", Colors.YELLOW)
+            continue
+        size = dir_sizes[item]
+        print_colored(f"🗑️ Directorio: {item}/ ({_format_size(size)})", Colors.YELLOW)
+        cleaned_count += 1
+        cleaned_size += size
+    
+    for file, outcome in _remove_files(files_to_delete, jobs=jobs):
+        if isinstance(outcome, Exception):
+            print_colored(f"⚠️ No se pudo eliminar {file}: {outcome}", Colors.YELLOW)
+            continue
+        print_colored(f"🗑️ Archivo: {file} ({_format_size(outcome)})", Colors.YELLOW)
+        cleaned_count += 1
+        cleaned_size += outcome
     
     # Limpiar carpetas vacías
     if deep:
@@ -404,6 +398,159 @@ def clean_project(deep=False, preserve_outputs=False):
     if cleaned_count > 0:
         print_colored("💡 Sugerencia: Ejecuta 'python manage.py status' para ver el estado actual", Colors.BLUE)
 
+def _scan_clean_targets(items):
+    """Recorre el árbol una sola vez y devuelve (directorios, archivos) a eliminar"""
+    # Nombres exactos: solo en la raíz; '*.ext': cualquier nivel;
+    # 'carpeta/*.ext': dentro de cualquier carpeta con ese nombre
+    top_names = {item for item in items if "*" not in item}
+    name_re = _compile_wildcards([item for item in items if "*" in item and "/" not in item])
+    nested = {}
+    for item in items:
+        if "*" in item and "/" in item:
+            folder, pat = item.split("/", 1)
+            nested.setdefault(folder, []).append(pat)
+    nested_re = {folder: _compile_wildcards(pats) for folder, pats in nested.items()}
+    
+    dirs_to_delete = []
+    files_to_delete = []
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        parent_name = os.path.basename(rel_dir)
+        try:
+            with os.scandir(rel_dir or ".") as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            
+            if not rel_dir and entry.name in top_names:
+                (dirs_to_delete if is_dir else files_to_delete).append(rel_path)
+            elif is_dir:
+                # Se poda antes de descender (ocultas y CLEAN_SKIP_DIRS)
+                if not entry.name.startswith(".") and entry.name not in CLEAN_SKIP_DIRS:
+                    pending.append(rel_path)
+            elif entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                # Como glob, los comodines no alcanzan archivos ocultos (.x.swp)
+                folder_re = nested_re.get(parent_name)
+                if (name_re and name_re.match(entry.name)) or (
+                    folder_re and folder_re.match(entry.name)
+                ):
+                    files_to_delete.append(rel_path)
+    
+    return dirs_to_delete, files_to_delete
+
+def _compile_wildcards(patterns):
+    """Une varios comodines en una sola regex compilada (None si no hay patrones)"""
+    if not patterns:
+        return None
+    import re
+    from fnmatch import translate
+    # fnmatch ignora mayúsculas en Windows; se replica con IGNORECASE
+    flags = re.IGNORECASE if IS_WIN else 0
+    return re.compile("|".join(translate(pat) for pat in patterns), flags)
+
+def _remove_dirs(dirs):
+    """Elimina directorios y devuelve {directorio: error} de los que fallaron"""
+    errors = {}
+    # Un único 'rm -rf' es mucho más rápido que shutil.rmtree en árboles
+    # grandes como .venv; NOPAL_FAST_RM=0 lo desactiva
+    fast_rm = (
+        os.name == "posix"
+        and os.environ.get("NOPAL_FAST_RM", "1") != "0"
+        and shutil.which("rm") is not None
+    )
+    
+    if fast_rm and dirs:
+        # Lotes de 1000 rutas para no exceder ARG_MAX
+        for i in range(0, len(dirs), 1000):
+            chunk = dirs[i:i + 1000]
+            if run_command(["rm", "-rf", "--", *chunk], check=False) is None:
+                break  # rm no se pudo ejecutar: se sigue con shutil.rmtree
+            for item in chunk:
+                if os.path.lexists(item):
+                    errors[item] = "rm -rf no pudo eliminarlo"
+        else:
+            return errors
+    
+    for item in dirs:
+        if not os.path.lexists(item) or item in errors:
+            continue
+        try:
+            shutil.rmtree(item)
+        except Exception as e:
+            errors[item] = e
+    return errors
+
+def _remove_files(files, jobs=None):
+    """Elimina archivos en paralelo por carpeta y devuelve [(ruta, tamaño o excepción)]"""
+    # Se agrupan por carpeta para abrir cada una una sola vez
+    by_dir = {}
+    for path in files:
+        by_dir.setdefault(os.path.dirname(path), []).append(path)
+    
+    # unlink libera el GIL; en discos giratorios el paralelismo empeora: serial
+    if jobs is None:
+        jobs = 1 if _is_rotational_disk(".") else min(32, (os.cpu_count() or 1) * 4)
+    jobs = max(1, min(jobs, len(by_dir)))
+    
+    results = []
+    if jobs == 1:
+        for folder, paths in by_dir.items():
+            results.extend(_remove_files_in_dir(folder, paths))
+        return results
+    
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        # map conserva el orden de las carpetas para el reporte
+        for group in pool.map(lambda item: _remove_files_in_dir(*item), by_dir.items()):
+            results.extend(group)
+    return results
+
+def _is_rotational_disk(path):
+    """Indica si 'path' está en un disco giratorio (HDD)"""
+    # Solo se puede saber en Linux vía /sys; si no, se asume SSD
+    try:
+        dev = os.stat(path).st_dev
+        block = os.path.realpath(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}")
+        # Una partición no tiene queue/: se consulta el disco padre
+        for candidate in (block, os.path.dirname(block)):
+            flag = os.path.join(candidate, "queue", "rotational")
+            if os.path.exists(flag):
+                with open(flag) as f:
+                    return f.read().strip() == "1"
+    except (OSError, ValueError, AttributeError):
+        pass
+    return False
+
+def _remove_files_in_dir(folder, paths):
+    """Elimina archivos de una misma carpeta y devuelve [(ruta, tamaño o excepción)]"""
+    # Donde se soporta, stat/unlink relativos a la carpeta abierta (unlinkat)
+    # evitan resolver la ruta completa en cada borrado
+    dir_fd = None
+    if os.unlink in os.supports_dir_fd and os.stat in os.supports_dir_fd:
+        try:
+            dir_fd = os.open(folder or ".", os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        except OSError:
+            dir_fd = None
+    
+    results = []
+    try:
+        for path in paths:
+            target = os.path.basename(path) if dir_fd is not None else path
+            try:
+                size = os.stat(target, dir_fd=dir_fd, follow_symlinks=False).st_size
+                os.unlink(target, dir_fd=dir_fd)
+                results.append((path, size))
+            except Exception as e:
+                results.append((path, e))
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    return results
+
 def _format_size(size_bytes):
     """Formatea tamaño en bytes a formato legible"""
     if size_bytes == 0:
@@ -500,6 +647,8 @@ Ejemplos:
   python manage.py run-image --source examples/test.jpg --save output/result.png
   python manage.py run --source 0 --min_matches 12 --ratio 0.8
   python manage.py clean --deep --preserve-outputs
+  python manage.py clean --jobs 1           (borrado serial, sin hilos)
+  NOPAL_FAST_RM=0 python manage.py clean    (shutil.rmtree en vez de 'rm -rf')
         """)
     
     parser.add_argument('command', nargs='?', default='help',
@@ -512,10 +661,15 @@ Ejemplos:
     parser.add_argument('--save', help='Archivo de salida')
     parser.add_argument('--min_matches', type=int, help='Mínimo coincidencias (default: 18)')
     parser.add_argument('--ratio', type=float, help='Ratio test Lowe (default: 0.75)')
+    parser.add_argument('--max_side', type=int, help='Lado máximo para detectar keypoints, 0 = completo (default: 800)')
+    parser.add_argument('--hw_encode', action='store_true', help='Codificar video de salida por hardware (GPU) si está disponible')
+    parser.add_argument('--nfeatures', type=int, help='Máximo de keypoints ORB (default: 2000)')
+    parser.add_argument('--fast_threshold', type=int, help='Umbral FAST de ORB (default: 20)')
     
     # Parámetros para limpieza
     parser.add_argument('--deep', action='store_true', help='Limpieza profunda (incluye más archivos)')
     parser.add_argument('--preserve-outputs', action='store_true', help='Preservar archivos de salida en limpieza profunda')
+    parser.add_argument('--jobs', type=int, help='Hilos para borrar archivos (default: auto, 1 en discos HDD)')
     
     args = parser.parse_args()
     
@@ -547,10 +701,10 @@ Ejemplos:
             print_colored("❌ Entorno virtual no configurado", Colors.RED)
     
     elif args.command == 'clean':
-        clean_project(deep=args.deep, preserve_outputs=args.preserve_outputs)
+        clean_project(deep=args.deep, preserve_outputs=args.preserve_outputs, jobs=args.jobs)
     
     elif args.command == 'deep-clean':
-        clean_project(deep=True, preserve_outputs=args.preserve_outputs)
+        clean_project(deep=True, preserve_outputs=args.preserve_outputs, jobs=args.jobs)
     
     elif args.command.startswith('run'):
         # Configurar parámetros según el tipo de run
@@ -565,7 +719,11 @@ Ejemplos:
             source=source,
             save=save,
             min_matches=args.min_matches,
-            ratio=args.ratio
+            ratio=args.ratio,
+            max_side=args.max_side,
+            nfeatures=args.nfeatures,
+            fast_threshold=args.fast_threshold,
+            hw_encode=args.hw_encode
         )
     
     else:
@@ -18,24 +18,64 @@ Uso rápido:
 from __future__ import annotations
 
 import argparse
+import functools
+import importlib.util
 import os
 import platform
+import queue
 import shutil
 import subprocess
 import sys
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional, Tuple, List, TYPE_CHECKING
+from typing import Any, Callable, Optional, Tuple, List
 
-# Importes solo para type-checking (no se ejecutan en runtime).
-# Evita E0401 (import-error) y “invalid type form” en Pylance.
-if TYPE_CHECKING:  # pragma: no cover
-    import cv2 as _cv2_type  # type: ignore
-    import numpy as _np_type  # type: ignore
+
+def _lazy_import(name: str) -> Any:
+    """
+    Importa un módulo de forma diferida: se ejecuta en el primer acceso a
+    un atributo. Devuelve None si el módulo no está instalado.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# cv2/numpy se enlazan una sola vez a nivel de módulo, pero su carga real
+# (~100 ms para OpenCV) ocurre solo al usarlos: la etapa bootstrap no la paga
+# y funciona aunque aún no estén instalados.
+_cv2 = _lazy_import("cv2")
+_np = _lazy_import("numpy")
+
+
+def _deps_import_error() -> Optional[ImportError]:
+    """Fuerza la carga de cv2/numpy y devuelve el error si alguno falla."""
+    if _cv2 is None or _np is None:
+        missing = "cv2" if _cv2 is None else "numpy"
+        return ModuleNotFoundError(f"No module named '{missing}'")
+    try:
+        _cv2.__version__  # pylint: disable=pointless-statement
+        _np.__version__  # pylint: disable=pointless-statement
+    except ImportError as exc:
+        return exc
+    return None
 
 REQS: List[str] = ["opencv-python>=4.9.0", "numpy>=1.26"]
 VENV_DIR = Path(".venv")
 
+# Extensiones reconocidas (minúsculas), evaluadas una sola vez.
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"})
+VIDEO_SAVE_EXTS = frozenset({".mp4", ".mov", ".m4v"})
+
 IS_WIN = platform.system().lower().startswith("win")
 IS_MAC = platform.system().lower().startswith("darwin")
 IS_LINUX = platform.system().lower().startswith("linux")
@@ -75,13 +115,18 @@ def python_exe_in_venv() -> str:
     return str(VENV_DIR / ("Scripts/python.exe" if IS_WIN else "bin/python"))
 
 
+@functools.lru_cache(maxsize=1)
 def ensure_python3_available() -> str:
     """
     Verifica que exista un intérprete Python 3 en PATH.
     Devuelve el comando invocable ('python3'/'py'/'python').
+    Solo lanza '--version' para candidatos presentes en PATH; el resultado
+    se cachea para no repetir los subprocesos.
     """
     candidates = ["python3", "py", "python"]
     for cand in candidates:
+        if shutil.which(cand) is None:
+            continue
         try:
             out = subprocess.run(  # noqa: S603
                 [cand, "--version"],
@@ -104,20 +149,27 @@ def ensure_python3_available() -> str:
     )
 
 
-def create_venv(py_cmd: str) -> None:
-    """Crea el entorno virtual .venv si no existe."""
+def create_venv(py_cmd: str) -> bool:
+    """Crea el entorno virtual .venv si no existe. Devuelve True si lo creó."""
     if VENV_DIR.exists():
         info("Venv ya existe, continúo.")
-        return
+        return False
     info("Creando entorno virtual .venv ...")
     run_cmd([py_cmd, "-m", "venv", str(VENV_DIR)], check=True)
+    return True
 
 
-def pip_install(packages: List[str]) -> None:
-    """Actualiza pip/wheel e instala las dependencias requeridas en el venv."""
+def pip_install(packages: List[str], upgrade_tools: bool = True) -> None:
+    """
+    Instala las dependencias requeridas en el venv. Con upgrade_tools antes
+    actualiza pip/wheel, para que los requisitos los resuelva el pip nuevo.
+    """
     py = python_exe_in_venv()
-    run_cmd([py, "-m", "pip", "install", "--upgrade", "pip", "wheel"], check=True)
-    run_cmd([py, "-m", "pip", "install", *packages], check=True)
+    pip = [py, "-m", "pip", "install", "--disable-pip-version-check", "--no-input"]
+    if upgrade_tools:
+        run_cmd([*pip, "--upgrade", "pip", "wheel"], check=True)
+    # Sin --upgrade: si ya se cumplen los requisitos, pip no toca el índice.
+    run_cmd([*pip, *packages], check=True)
 
 
 def check_system_libs(save_path: Optional[str]) -> None:
@@ -125,7 +177,7 @@ def check_system_libs(save_path: Optional[str]) -> None:
     Muestra sugerencias de instalación de librerías del sistema
     (ffmpeg para video/MP4, librerías de GUI en Linux).
     """
-    if save_path and Path(save_path).suffix.lower() in {".mp4", ".mov", ".m4v"}:
+    if save_path and Path(save_path).suffix.lower() in VIDEO_SAVE_EXTS:
         if shutil.which("ffmpeg") is None:
             warn("ffmpeg no encontrado. Para mejor soporte de video:")
             if IS_MAC:
@@ -142,29 +194,139 @@ def check_system_libs(save_path: Optional[str]) -> None:
 
 
 def relaunch_inside_venv(argv: List[str]) -> None:
-    """Reejecuta este script dentro del venv ya creado para la fase de ejecución."""
+    """
+    Reejecuta este script dentro del venv ya creado para la fase de ejecución.
+    En POSIX reemplaza el proceso actual (execve): no queda un intérprete
+    padre residente esperando al hijo. En Windows exec no conserva el
+    proceso, así que se lanza como subproceso y se propaga su código.
+    """
     py = python_exe_in_venv()
     env = os.environ.copy()
     env["NOPAL_BOOTSTRAPPED"] = "1"
     script_path = str(Path(__file__).resolve())
     cmd = [py, script_path, "--stage", "run", *argv]
+    if not IS_WIN:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execve(py, cmd, env)  # noqa: S606
     result = subprocess.run(cmd, env=env, check=False)  # noqa: S603
     sys.exit(result.returncode)
 
 
 # ==================== BLOQUE DETECTOR ====================
 
+# Por debajo de este número de descriptores en el frame, el índice LSH no
+# compensa y se usa fuerza bruta.
+FLANN_MIN_DESCRIPTORS = 20
+
+
 @dataclass
-class OrbContext:
+class OrbContext:  # pylint: disable=too-many-instance-attributes
     """Contexto de detección ORB y parámetros de matching."""
     orb: Any
     bf: Any
+    flann: Any
     kp_ref: List[Any]
     des_ref: Any
     ref_h: int
     ref_w: int
+    ref_xy: Any  # coordenadas (N, 2) float32 de kp_ref
+    ref_corners: Any  # esquinas de la referencia (4, 1, 2) para perspectiveTransform
     min_matches: int
     ratio: float
+    max_side: int  # lado máximo del frame para detectar keypoints (0 = sin reducir)
+    # Buffers de grises reutilizados entre frames (se recrean si cambia el
+    # tamaño): a resolución completa y reducido a max_side.
+    gray_buf: Any = field(default=None, repr=False)
+    small_buf: Any = field(default=None, repr=False)
+
+
+class FrameReader:  # pylint: disable=too-many-instance-attributes
+    """
+    Lee frames de un VideoCapture reutilizando un anillo de buffers en lugar
+    de reservar un ndarray nuevo por frame. El anillo se llena con los
+    primeros frames leídos; después cada lectura sobrescribe el buffer más
+    antiguo. ring_size debe superar el número de frames que siguen en uso
+    fuera del lector (p. ej. los pendientes en AsyncVideoWriter).
+
+    Con start_async() la decodificación pasa a un hilo productor que va
+    por delante del consumidor, solapándola con la detección.
+    """
+
+    def __init__(self, cap: Any, ring_size: int = 1) -> None:
+        self.cap = cap
+        self.ring_size = max(1, ring_size)
+        self._buffers: List[Any] = []
+        self._idx = 0
+        self._queue: "Optional[queue.Queue[Tuple[bool, Optional[Any]]]]" = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def start_async(self, queue_size: int = 4) -> None:
+        """Lanza el hilo productor; debe llamarse antes de la primera lectura."""
+        # El anillo crece para cubrir los frames en cola y el que se decodifica.
+        self.ring_size += queue_size + 1
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._produce, name="nopal-reader", daemon=True)
+        self._thread.start()
+
+    def _produce(self) -> None:
+        """Bucle del hilo productor; termina al fin del stream, con error o con stop()."""
+        try:
+            while not self._stop.is_set():
+                item = self._read_into_ring()
+                if not item[0]:
+                    break
+                self._put(item)
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            self._error = exc  # read() lo relanza en el hilo principal
+        finally:
+            # Siempre se encola el fin para que read() no espere para siempre.
+            self._put((False, None))
+
+    def _put(self, item: Tuple[bool, Optional[Any]]) -> None:
+        """Encola un item sin bloquearse indefinidamente si se llamó a stop()."""
+        assert self._queue is not None
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _read_into_ring(self) -> Tuple[bool, Optional[Any]]:
+        """Equivalente a cap.read(), pero escribiendo en un buffer reutilizado."""
+        if len(self._buffers) < self.ring_size:
+            ok, frame = self.cap.read()
+            if ok:
+                self._buffers.append(frame)
+            return ok, frame
+
+        buf = self._buffers[self._idx]
+        buf.flags.writeable = True  # AsyncVideoWriter lo deja en solo lectura
+        ok, frame = self.cap.read(buf)
+        if ok and frame is not buf:
+            # Cambió el tamaño del stream: OpenCV reservó un buffer nuevo.
+            self._buffers[self._idx] = frame
+        self._idx = (self._idx + 1) % self.ring_size
+        return ok, frame
+
+    def read(self) -> Tuple[bool, Optional[Any]]:
+        """Devuelve (ok, frame) como cap.read()."""
+        if self._queue is None:
+            return self._read_into_ring()
+        item = self._queue.get()
+        if not item[0] and self._error is not None:
+            raise self._error
+        return item
+
+    def stop(self) -> None:
+        """Detiene el hilo productor (si existe) antes de liberar la captura."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
 
 
 def open_source(src: str) -> Tuple[Optional[Any], bool, Optional[Any]]:
@@ -172,9 +334,6 @@ def open_source(src: str) -> Tuple[Optional[Any], bool, Optional[Any]]:
     Abre una fuente (cámara/video/imagen) y devuelve:
     (captura, is_stream, first_frame_si_imagen)
     """
-    import cv2 as _cv2  # pylint: disable=import-outside-toplevel
-    import numpy as _np  # pylint: disable=import-outside-toplevel, unused-import
-
     if src.isdigit():
         cap = _cv2.VideoCapture(int(src))
         if not cap.isOpened():
@@ -185,9 +344,7 @@ def open_source(src: str) -> Tuple[Optional[Any], bool, Optional[Any]]:
     if not path.exists():
         raise FileNotFoundError(f"No existe la fuente: {src}")
 
-    ext = path.suffix.lower()
-    img_exts = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
-    if ext in img_exts:
+    if path.suffix.lower() in IMAGE_EXTS:
         img = _cv2.imread(str(path))
         if img is None:
             raise RuntimeError(f"No pude leer la imagen: {src}")
@@ -201,8 +358,6 @@ def open_source(src: str) -> Tuple[Optional[Any], bool, Optional[Any]]:
 
 def load_reference(ref_path: str) -> Tuple[Any, Any]:
     """Carga la imagen de referencia y su versión en escala de grises."""
-    import cv2 as _cv2  # pylint: disable=import-outside-toplevel
-
     ref_img = _cv2.imread(ref_path)
     if ref_img is None:
         raise FileNotFoundError(f"No pude abrir la referencia: {ref_path}")
@@ -210,54 +365,123 @@ def load_reference(ref_path: str) -> Tuple[Any, Any]:
     return ref_img, ref_gray
 
 
-def prepare_orb(ref_gray: Any, nfeatures: int = 2000) -> Tuple[Any, Any, List[Any], Any]:
-    """Crea ORB y BFMatcher, y computa keypoints/descriptores de la referencia."""
-    import cv2 as _cv2  # pylint: disable=import-outside-toplevel
-
-    orb = _cv2.ORB_create(nfeatures=nfeatures, scaleFactor=1.2, nlevels=8)
+def prepare_orb(
+    ref_gray: Any, nfeatures: int = 2000, fast_threshold: int = 20
+) -> Tuple[Any, Any, Any, List[Any], Any]:
+    """
+    Crea ORB, BFMatcher y un índice FLANN-LSH entrenado con los descriptores
+    de la referencia, y computa keypoints/descriptores de la referencia.
+    """
+    # Un fastThreshold más alto descarta esquinas débiles: menos keypoints
+    # y matching más barato (el costo escala con N_ref x N_frame).
+    orb = _cv2.ORB_create(
+        nfeatures=nfeatures,
+        scaleFactor=1.2,
+        nlevels=8,
+        fastThreshold=fast_threshold,
+    )
     kp_ref, des_ref = orb.detectAndCompute(ref_gray, None)
     if des_ref is None or len(kp_ref) < 8:
         raise RuntimeError(
             "Muy pocos puntos clave en la referencia. Usa una foto con más textura/detalle."
         )
     bf = _cv2.BFMatcher(_cv2.NORM_HAMMING, crossCheck=False)
-    return orb, bf, kp_ref, des_ref
+    # algorithm=6 -> FLANN_INDEX_LSH (descriptores binarios).
+    flann = _cv2.FlannBasedMatcher(
+        {"algorithm": 6, "table_number": 6, "key_size": 12, "multi_probe_level": 1},
+        {"checks": 32},
+    )
+    flann.add([des_ref])
+    flann.train()
+    return orb, bf, flann, kp_ref, des_ref
 
 
-def build_context(ref_gray: Any, min_matches: int, ratio: float) -> OrbContext:
-    """Construye el contexto ORB/BF con metadatos de referencia y umbrales."""
-    orb, bf, kp_ref, des_ref = prepare_orb(ref_gray)
+def build_context(  # pylint: disable=too-many-arguments
+    ref_gray: Any,
+    min_matches: int,
+    ratio: float,
+    *,
+    max_side: int = 800,
+    nfeatures: int = 2000,
+    fast_threshold: int = 20,
+) -> OrbContext:
+    """Construye el contexto ORB/BF/FLANN con metadatos de referencia y umbrales."""
+    orb, bf, flann, kp_ref, des_ref = prepare_orb(ref_gray, nfeatures, fast_threshold)
     h_ref, w_ref = ref_gray.shape
     return OrbContext(
         orb=orb,
         bf=bf,
+        flann=flann,
         kp_ref=kp_ref,
         des_ref=des_ref,
         ref_h=h_ref,
         ref_w=w_ref,
+        ref_xy=_cv2.KeyPoint_convert(kp_ref),
+        ref_corners=_np.float32(
+            [[0, 0], [w_ref, 0], [w_ref, h_ref], [0, h_ref]]
+        ).reshape(-1, 1, 2),
         min_matches=min_matches,
         ratio=ratio,
+        max_side=max_side,
     )
 
 
-def detect_and_draw(frame: Any, ctx: OrbContext) -> Any:
+def match_descriptors(des_frm: Any, ctx: OrbContext) -> Any:
+    """
+    Empareja los descriptores del frame con los de la referencia aplicando
+    el ratio test de Lowe. Devuelve un array int32 (K, 2) con pares
+    (idx_referencia, idx_frame).
+    """
+    # En ambas ramas query = frame: un candidato por descriptor del frame, así
+    # el conteo de matches no salta al cruzar FLANN_MIN_DESCRIPTORS.
+    if len(des_frm) >= FLANN_MIN_DESCRIPTORS:
+        # El índice LSH está entrenado con la referencia.
+        knn = ctx.flann.knnMatch(des_frm, k=2)
+    else:
+        knn = ctx.bf.knnMatch(des_frm, ctx.des_ref, k=2)
+
+    # Una sola pasada en Python para volcar los DMatch; el filtrado es vectorial.
+    # LSH puede devolver menos de 2 vecinos; esos pares se descartan.
+    rows = [
+        (pair[0].queryIdx, pair[0].trainIdx, pair[0].distance, pair[1].distance)
+        for pair in knn
+        if len(pair) == 2
+    ]
+    if not rows:
+        return _np.empty((0, 2), dtype=_np.int32)
+    table = _np.array(rows, dtype=_np.float64)
+    keep = table[:, 2] < ctx.ratio * table[:, 3]
+    pairs = table[keep, :2].astype(_np.int32)
+    return pairs[:, ::-1]
+
+
+def detect_and_draw(frame: Any, ctx: OrbContext, inplace: bool = False) -> Any:
     """
     Detecta el nopal específico en 'frame' usando ORB+Homography
     y dibuja el polígono de proyección si la homografía es válida.
+    Con inplace=True dibuja directamente sobre 'frame' (sin copiarlo);
+    úsalo solo si el llamador no vuelve a necesitar el frame original.
     """
-    import cv2 as _cv2  # pylint: disable=import-outside-toplevel
-    import numpy as _np  # pylint: disable=import-outside-toplevel
-
-    output = frame.copy()
-    gray = _cv2.cvtColor(frame, _cv2.COLOR_BGR2GRAY)
+    output = frame if inplace else frame.copy()
+    if ctx.gray_buf is None or ctx.gray_buf.shape != frame.shape[:2]:
+        ctx.gray_buf = _np.empty(frame.shape[:2], dtype=_np.uint8)
+    gray = _cv2.cvtColor(frame, _cv2.COLOR_BGR2GRAY, dst=ctx.gray_buf)
+
+    # Detectar sobre una versión reducida: el costo de ORB escala con el área.
+    # Los puntos se reescalan a resolución completa antes de la homografía.
+    scale = 1.0
+    if ctx.max_side and max(gray.shape) > ctx.max_side:
+        scale = ctx.max_side / max(gray.shape)
+        small_h, small_w = round(gray.shape[0] * scale), round(gray.shape[1] * scale)
+        if ctx.small_buf is None or ctx.small_buf.shape != (small_h, small_w):
+            ctx.small_buf = _np.empty((small_h, small_w), dtype=_np.uint8)
+        gray = _cv2.resize(
+            gray, (small_w, small_h), dst=ctx.small_buf, interpolation=_cv2.INTER_AREA
+        )
 
     kp_frm, des_frm = ctx.orb.detectAndCompute(gray, None)
-    good = []
     if des_frm is not None and kp_frm and len(kp_frm) >= 8:
-        matches = ctx.bf.knnMatch(ctx.des_ref, des_frm, k=2)
-        for m, n in matches:
-            if m.distance < ctx.ratio * n.distance:
-                good.append(m)
+        good = match_descriptors(des_frm, ctx)
 
         _cv2.putText(
             output,
@@ -270,15 +494,13 @@ def detect_and_draw(frame: Any, ctx: OrbContext) -> Any:
         )
 
         if len(good) >= ctx.min_matches:
-            src_pts = _np.float32([ctx.kp_ref[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
-            dst_pts = _np.float32([kp_frm[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+            frm_xy = _cv2.KeyPoint_convert(kp_frm)
+            src_pts = ctx.ref_xy[good[:, 0]].reshape(-1, 1, 2)
+            dst_pts = (frm_xy[good[:, 1]] / scale).reshape(-1, 1, 2)
             homography, _mask = _cv2.findHomography(src_pts, dst_pts, _cv2.RANSAC, 5.0)
 
             if homography is not None:
-                corners = _np.float32(
-                    [[0, 0], [ctx.ref_w, 0], [ctx.ref_w, ctx.ref_h], [0, ctx.ref_h]]
-                ).reshape(-1, 1, 2)
-                proj = _cv2.perspectiveTransform(corners, homography)
+                proj = _cv2.perspectiveTransform(ctx.ref_corners, homography)
 
                 output = _cv2.polylines(
                     output,
@@ -322,43 +544,161 @@ def detect_and_draw(frame: Any, ctx: OrbContext) -> Any:
     return output
 
 
+class AsyncVideoWriter:
+    """
+    Envuelve un cv2.VideoWriter y codifica los frames en un hilo aparte, de
+    modo que la escritura se solapa con la detección del siguiente frame.
+    Los frames se encolan sin copiarse: write() los marca como solo lectura
+    para que cualquier modificación posterior falle en lugar de corromper
+    el video.
+    """
+
+    def __init__(self, writer: Any, max_pending: int = 8) -> None:
+        self._writer = writer
+        self.max_pending = max_pending
+        self._queue: "queue.Queue[Optional[Any]]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._drain, name="nopal-writer", daemon=True)
+        self._thread.start()
+
+    def _drain(self) -> None:
+        """Bucle del hilo escritor; termina al recibir el centinela None."""
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is not None:
+                continue  # Sigue vaciando la cola para no bloquear al productor.
+            try:
+                self._writer.write(frame)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self._error = exc
+
+    def write(self, frame: Any) -> None:
+        """Encola un frame; bloquea si hay max_pending frames sin escribir."""
+        if self._error is not None:
+            raise RuntimeError(f"Falló la escritura del video: {self._error}")
+        frame.flags.writeable = False
+        self._queue.put(frame)
+
+    def release(self) -> None:
+        """Espera a que se escriban los frames pendientes y cierra el writer."""
+        self._queue.put(None)
+        try:
+            self._thread.join()
+        finally:
+            self._writer.release()
+        if self._error is not None:
+            raise RuntimeError(f"Falló la escritura del video: {self._error}")
+
+
+def open_video_writer(
+    path: str, fps: float, size: Tuple[int, int], hw_accel: bool = False
+) -> Any:
+    """
+    Abre el VideoWriter de salida. Con hw_accel intenta H.264 por hardware
+    (NVENC/VAAPI/QSV/AMF vía backend FFmpeg) y, si no está disponible,
+    vuelve al codificador por software 'mp4v'. Falla de inmediato si el
+    writer no puede abrirse, antes de procesar ningún frame.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if hw_accel and hasattr(_cv2, "VIDEOWRITER_PROP_HW_ACCELERATION"):
+        writer = _cv2.VideoWriter(
+            path,
+            _cv2.CAP_FFMPEG,
+            _cv2.VideoWriter_fourcc(*"avc1"),
+            fps,
+            size,
+            [
+                _cv2.VIDEOWRITER_PROP_HW_ACCELERATION,
+                _cv2.VIDEO_ACCELERATION_ANY,
+            ],
+        )
+        if writer.isOpened():
+            info("Codificación de video por hardware activada.")
+            return writer
+        writer.release()
+        warn("Codificación por hardware no disponible; uso 'mp4v' por software.")
+
+    writer = _cv2.VideoWriter(path, _cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError(
+            f"No pude abrir el video de salida: {path} "
+            "(verifica la extensión .mp4 y permisos de escritura)."
+        )
+    return writer
+
+
+def _open_stream_io(
+    args: argparse.Namespace, cap: Any
+) -> Tuple[FrameReader, Optional[AsyncVideoWriter]]:
+    """Prepara el lector asíncrono del stream y, si hay --save, el writer de video."""
+    writer = None
+    if args.save:
+        width = int(cap.get(_cv2.CAP_PROP_FRAME_WIDTH) or 1280)
+        height = int(cap.get(_cv2.CAP_PROP_FRAME_HEIGHT) or 720)
+        fps = cap.get(_cv2.CAP_PROP_FPS)
+        if not fps or fps <= 1:
+            fps = 25
+        writer = AsyncVideoWriter(
+            open_video_writer(args.save, fps, (width, height), hw_accel=args.hw_encode)
+        )
+
+    try:
+        # Con writer, hasta max_pending frames esperan en su cola y uno más
+        # se está codificando: el anillo debe cubrirlos más el frame actual.
+        reader = FrameReader(cap, writer.max_pending + 2 if writer is not None else 1)
+        if args.source.isdigit():
+            # Cámara: sin cola propia en el driver y un solo frame adelantado,
+            # para no mostrar imágenes viejas.
+            cap.set(_cv2.CAP_PROP_BUFFERSIZE, 1)
+            reader.start_async(queue_size=1)
+        else:
+            reader.start_async(queue_size=4)
+    except BaseException:
+        if writer is not None:
+            writer.release()
+        raise
+    return reader, writer
+
+
 def run_detector(args: argparse.Namespace) -> None:
     """Ejecuta el pipeline de detección para imagen/cámara/video."""
-    import cv2 as _cv2  # pylint: disable=import-outside-toplevel
-    import numpy as _np  # pylint: disable=import-outside-toplevel, unused-import
-
     _ref_img, ref_gray = load_reference(args.ref)
-    ctx = build_context(ref_gray, args.min_matches, args.ratio)
+    ctx = build_context(
+        ref_gray,
+        args.min_matches,
+        args.ratio,
+        max_side=args.max_side,
+        nfeatures=args.nfeatures,
+        fast_threshold=args.fast_threshold,
+    )
 
     cap, is_stream, first_frame = open_source(args.source)
 
     writer = None
-    fourcc = _cv2.VideoWriter_fourcc(*"mp4v")
-    fps_guess = 25
+    reader = None
 
     try:
         if is_stream:
-            if args.save:
-                width = int(cap.get(_cv2.CAP_PROP_FRAME_WIDTH) or 1280)  # type: ignore
-                height = int(cap.get(_cv2.CAP_PROP_FRAME_HEIGHT) or 720)  # type: ignore
-                fps = cap.get(_cv2.CAP_PROP_FPS)  # type: ignore
-                if not fps or fps <= 1:
-                    fps = fps_guess
-                writer = _cv2.VideoWriter(args.save, fourcc, fps, (width, height))
-
+            reader, writer = _open_stream_io(args, cap)
+            # Enlace local para el bucle de frames
+            write_frame = writer.write if writer is not None else None
             while True:
-                ok, frame = cap.read()  # type: ignore
+                ok, frame = reader.read()
                 if not ok:
                     warn("Fin del stream o frame inválido.")
                     break
-                out = detect_and_draw(frame, ctx)
-                if writer is not None:
-                    writer.write(out)
+                # El buffer no se relee hasta dar la vuelta al anillo: se dibuja
+                # encima sin copiarlo.
+                out = detect_and_draw(frame, ctx, inplace=True)
+                if write_frame is not None:
+                    write_frame(out)
                 _cv2.imshow("Nopal detector (q para salir)", out)
                 if _cv2.waitKey(1) & 0xFF == ord("q"):
                     break
         else:
-            out = detect_and_draw(first_frame, ctx)  # type: ignore[arg-type]
+            out = detect_and_draw(first_frame, ctx, inplace=True)  # type: ignore[arg-type]
             if args.save:
                 Path(args.save).parent.mkdir(parents=True, exist_ok=True)
                 _cv2.imwrite(args.save, out)
@@ -369,11 +709,36 @@ def run_detector(args: argparse.Namespace) -> None:
             )
             _cv2.waitKey(0)
     finally:
+        if reader is not None:
+            reader.stop()
         if is_stream and cap is not None:
             cap.release()
-        if writer is not None:
-            writer.release()
-        _cv2.destroyAllWindows()
+        try:
+            if writer is not None:
+                writer.release()  # propaga errores tardíos del hilo escritor
+        finally:
+            _cv2.destroyAllWindows()
+
+
+def _int_at_least(minimum: int) -> Callable[[str], int]:
+    """Crea un tipo argparse que acepta enteros >= minimum."""
+
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            number = minimum - 1
+        if number < minimum:
+            raise argparse.ArgumentTypeError(
+                f"debe ser un entero >= {minimum} (recibido {value!r})"
+            )
+        return number
+
+    return parse
+
+
+_non_negative_int = _int_at_least(0)
+_positive_int = _int_at_least(1)
 
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
@@ -401,6 +766,11 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=None,
         help="Ruta para guardar salida (PNG/JPG para imagen; MP4 para video/cámara).",
     )
+    parser.add_argument(
+        "--hw_encode",
+        action="store_true",
+        help="Intenta codificar el video de salida por hardware (GPU); si falla usa mp4v.",
+    )
     parser.add_argument(
         "--min_matches",
         type=int,
@@ -413,6 +783,24 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=0.75,
         help="Ratio test de Lowe.",
     )
+    parser.add_argument(
+        "--max_side",
+        type=_non_negative_int,
+        default=800,
+        help="Lado máximo (px) del frame al detectar keypoints; 0 usa resolución completa.",
+    )
+    parser.add_argument(
+        "--nfeatures",
+        type=_positive_int,
+        default=2000,
+        help="Máximo de keypoints ORB por imagen (menos = matching más rápido).",
+    )
+    parser.add_argument(
+        "--fast_threshold",
+        type=_non_negative_int,
+        default=20,
+        help="Umbral FAST de ORB; valores mayores producen menos keypoints.",
+    )
     parser.add_argument(
         "--stage",
         choices=["bootstrap", "run"],
@@ -432,11 +820,9 @@ def main() -> None:
 
     if args.stage == "run":
         # En esta etapa, ya deberíamos tener las deps instaladas.
-        try:
-            import cv2 as _cv2  # pylint: disable=import-outside-toplevel, unused-import
-            import numpy as _np  # pylint: disable=import-outside-toplevel, unused-import
-        except ModuleNotFoundError as exc:
-            err(f"No se pudo importar una dependencia dentro del venv: {exc}")
+        import_error = _deps_import_error()
+        if import_error is not None:
+            err(f"No se pudo importar una dependencia dentro del venv: {import_error}")
             print("\nPosibles soluciones:")
             print(
                 "  - Reinstala dependencias:\n"
@@ -485,7 +871,7 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        create_venv(py_cmd)
+        venv_created = create_venv(py_cmd)
     except subprocess.CalledProcessError as exc:
         err(f"No pude crear venv: {exc}")
         print("Soluciones:")
@@ -495,7 +881,8 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        pip_install(REQS)
+        # pip/wheel solo se actualizan al crear el venv, no en cada ejecución.
+        pip_install(REQS, upgrade_tools=venv_created)
     except subprocess.CalledProcessError as exc:
         err("Falló la instalación de dependencias.")
         info(